@@ -1,20 +1,34 @@
 from __future__ import annotations
 
+import asyncio
+import io
 import os
-from typing import Dict, List, Optional
+from contextlib import AsyncExitStack
+from typing import Awaitable, Callable, Dict, List, Optional, TextIO, Tuple
 
 from pathlib import Path
 import sys
 
-from fastapi.testclient import TestClient
+import httpx
+from fastapi import FastAPI
+
+try:
+    import uvloop
+except ImportError:  # uvloop is optional (not available on Windows)
+    uvloop = None
 
 # Ensure project root is on sys.path so `src` imports work when running the script directly.
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
+# One pooled client is shared by every call in both demos.
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=100)
+HTTP_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
 
-def build_client() -> TestClient:
+def build_client() -> Tuple[Optional[FastAPI], httpx.AsyncClient]:
+    """Return the in-process app (None for a live server) and the client that talks to it."""
     # Load .env first so explicit settings win.
     try:
         from dotenv import load_dotenv
@@ -24,14 +38,20 @@ def build_client() -> TestClient:
     # Use mock by default ONLY if not explicitly set; respects .env/real env.
     os.environ.setdefault("AI_SERVER_MOCK", "1")
     os.environ.setdefault("OPENAI_MODEL", "gpt-5.1")
+
+    # AI_SERVER_URL points the scenarios at a running uvicorn instance over a keep-alive pool.
+    base_url = os.getenv("AI_SERVER_URL")
+    if base_url:
+        return None, httpx.AsyncClient(base_url=base_url, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+
     # Import after setting env so AI service picks up the mock flag.
     from src.main import app
 
-    return TestClient(app)
+    return app, httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test", timeout=HTTP_TIMEOUT)
 
 
-def call_analyze(
-    client: TestClient,
+async def call_analyze(
+    client: httpx.AsyncClient,
     session_id: str,
     user_input: Optional[str],
     ocr_texts: List[str],
@@ -45,13 +65,13 @@ def call_analyze(
         "dialogue_history": dialogue_history,
         "last_btn": last_btn,
     }
-    res = client.post("/api/analyze", json=payload)
+    res = await client.post("/api/analyze", json=payload)
     res.raise_for_status()
     return res.json()
 
 
-def call_screen_detect(
-    client: TestClient,
+async def call_screen_detect(
+    client: httpx.AsyncClient,
     session_id: str,
     previous_texts: List[str],
     current_texts: List[str],
@@ -67,7 +87,7 @@ def call_screen_detect(
         "user_input": user_input,
         "last_btn": last_btn,
     }
-    res = client.post("/api/screen/detect", json=payload)
+    res = await client.post("/api/screen/detect", json=payload)
     res.raise_for_status()
     return res.json()
 
@@ -76,17 +96,20 @@ def append_turn(history: List[Dict], role: str, utterance: str, action: Optional
     history.append({"role": role, "utterance": utterance, "action": action})
 
 
-def print_resp(prefix: str, resp: Dict) -> None:
-    print(f"\n[{prefix}] status={resp.get('status')}, confidence={resp.get('confidence')}")
-    print(f"  message: {resp.get('response_message')}")
-    print(f"  action : {resp.get('action')}")
+def print_resp(prefix: str, resp: Dict, out: Optional[TextIO] = None) -> None:
+    lines = [
+        f"\n[{prefix}] status={resp.get('status')}, confidence={resp.get('confidence')}",
+        f"  message: {resp.get('response_message')}",
+        f"  action : {resp.get('action')}",
+    ]
+    (out or sys.stdout).write("\n".join(lines) + "\n")
 
 
-def print_history(history: List[Dict]) -> None:
+def print_history(history: List[Dict], out: Optional[TextIO] = None) -> None:
     if not history:
-        print("  dialogue_history: (empty)")
+        (out or sys.stdout).write("  dialogue_history: (empty)\n")
         return
-    print("  dialogue_history:")
+    lines = ["  dialogue_history:"]
     for turn in history:
         role = turn.get("role", "?")
         utterance = turn.get("utterance") or ""
@@ -98,11 +121,52 @@ def print_history(history: List[Dict]) -> None:
             action_desc = f" [{action_type}:{params.get('target_text')}]"
         elif action_type:
             action_desc = f" [{action_type}]"
-        print(f"    - {role}: {utterance}{action_desc}")
+        lines.append(f"    - {role}: {utterance}{action_desc}")
+    (out or sys.stdout).write("\n".join(lines) + "\n")
+
+
+def warn_offscreen_target(resp: Dict, texts_set: frozenset, out: Optional[TextIO] = None) -> None:
+    action = resp.get("action") or {}
+    if action.get("type") != "click_text":
+        return
+    target = (action.get("params") or {}).get("target_text")
+    if target not in texts_set:
+        (out or sys.stdout).write(f"  warning: target_text {target!r} is not on this screen\n")
+
+
+def is_passive(step: Dict) -> bool:
+    return (step.get("user_inputs") or [None]) == [None]
+
 
+def is_redundant(screens: List[Dict], pos: int) -> bool:
+    """A passive step is redundant when the next step shows the same screen with a real utterance."""
+    if not is_passive(screens[pos]) or pos + 1 >= len(screens):
+        return False
+    nxt = screens[pos + 1]
+    return not is_passive(nxt) and nxt["texts"] == screens[pos]["texts"]
 
-def run_mid_demo(client: TestClient) -> None:
-    print("\n=== 중간 시연 시나리오 ===")
+
+def group_steps(screens: List[Dict]) -> List[List[Tuple[int, Dict]]]:
+    """Group each step marked `"parallel": True` with the step before it so they are analyzed concurrently.
+
+    Every analyze response is appended to the history and may move `last_btn`, so a step
+    only opts in when it does not depend on the previous answer. Redundant passive steps
+    (see `is_redundant`) are dropped entirely.
+    """
+    groups: List[List[Tuple[int, Dict]]] = []
+    for pos, step in enumerate(screens):
+        if is_redundant(screens, pos):
+            continue
+        idx = pos + 1
+        if step.get("parallel") and groups:
+            groups[-1].append((idx, step))
+        else:
+            groups.append([(idx, step)])
+    return groups
+
+
+async def run_mid_demo(client: httpx.AsyncClient, out: TextIO) -> None:
+    out.write("\n=== 중간 시연 시나리오 ===\n")
     session_id = "sess_mid"
     screen = ["버거", "사이드", "음료", "불고기 버거", "새우버거", "치즈버거", "치킨버거"]
     dialogue_history: List[Dict] = []
@@ -110,35 +174,35 @@ def run_mid_demo(client: TestClient) -> None:
 
     # 유스케이스 1: 소고기 들어간 메뉴
     user_input = "소고기 들어간 걸로 줘"
-    resp1 = call_analyze(client, session_id, user_input, screen, dialogue_history, last_btn)
+    resp1 = await call_analyze(client, session_id, user_input, screen, dialogue_history, last_btn)
     append_turn(dialogue_history, "user", user_input)
     append_turn(dialogue_history, "assistant", resp1["response_message"], resp1["action"])
     if resp1["action"]["type"] == "click_text":
         last_btn = resp1["action"]["params"].get("target_text", last_btn)
-    print_resp("유스케이스1-1", resp1)
-    print_history(dialogue_history)
+    print_resp("유스케이스1-1", resp1, out)
+    print_history(dialogue_history, out)
 
     # 사용자가 구체적으로 답한 상황
     user_input2 = "불고기 버거 줘"
-    resp2 = call_analyze(client, session_id, user_input2, screen, dialogue_history, last_btn)
+    resp2 = await call_analyze(client, session_id, user_input2, screen, dialogue_history, last_btn)
     append_turn(dialogue_history, "user", user_input2)
     append_turn(dialogue_history, "assistant", resp2["response_message"], resp2["action"])
     if resp2["action"]["type"] == "click_text":
         last_btn = resp2["action"]["params"].get("target_text", last_btn)
-    print_resp("유스케이스1-2", resp2)
-    print_history(dialogue_history)
+    print_resp("유스케이스1-2", resp2, out)
+    print_history(dialogue_history, out)
 
     # 유스케이스 2: 화면에 없는 메뉴(감자 튀김)
     user_input3 = "감자 튀김 주문해 줘"
-    resp3 = call_analyze(client, session_id, user_input3, screen, dialogue_history, last_btn)
+    resp3 = await call_analyze(client, session_id, user_input3, screen, dialogue_history, last_btn)
     append_turn(dialogue_history, "user", user_input3)
     append_turn(dialogue_history, "assistant", resp3["response_message"], resp3["action"])
-    print_resp("유스케이스2", resp3)
-    print_history(dialogue_history)
+    print_resp("유스케이스2", resp3, out)
+    print_history(dialogue_history, out)
 
 
-def run_final_demo(client: TestClient) -> None:
-    print("\n=== 최종 시연 시나리오 ===")
+async def run_final_demo(client: httpx.AsyncClient, out: TextIO) -> None:
+    out.write("\n=== 최종 시연 시나리오 ===\n")
     session_id = "sess_final"
     dialogue_history: List[Dict] = []
     last_btn: Optional[str] = None
@@ -447,50 +511,86 @@ def run_final_demo(client: TestClient) -> None:
         },
     ]
 
-    for idx, step in enumerate(screens, 1):
-        print(f"\n--- {step['name']} ({idx}/{len(screens)}) ---")
-        user_inputs = step.get("user_inputs") or [None]
-        primary_input = user_inputs[0]
-
-        resp = call_analyze(
-            client=client,
-            session_id=session_id,
-            user_input=primary_input,
-            ocr_texts=step["texts"],
-            dialogue_history=dialogue_history,
-            last_btn=last_btn,
+    for step in screens:
+        # 응답 검증(target_text가 화면에 있는지)은 O(1) 조회로 한다.
+        step["texts_set"] = frozenset(step["texts"])
+
+    for group in group_steps(screens):
+        # "parallel"로 표시된 화면은 앞 화면과 같은 히스토리로 동시에 분석하고, 결과는 원래 순서대로 반영한다.
+        primary_resps = await asyncio.gather(
+            *(
+                call_analyze(
+                    client=client,
+                    session_id=session_id,
+                    user_input=(step.get("user_inputs") or [None])[0],
+                    ocr_texts=step["texts"],
+                    dialogue_history=dialogue_history,
+                    last_btn=last_btn,
+                )
+                for _, step in group
+            )
         )
 
-        if primary_input:
-            append_turn(dialogue_history, "user", primary_input)
-        append_turn(dialogue_history, "assistant", resp["response_message"], resp["action"])
-        if resp["action"]["type"] == "click_text":
-            last_btn = resp["action"]["params"].get("target_text", last_btn)
-        print_resp("analyze", resp)
-        print_history(dialogue_history)
-
-        # Additional user inputs on the same screen (e.g., 되묻기 이후 답변)
-        extra_inputs = user_inputs[1:]
-        for extra_idx, extra in enumerate(extra_inputs, start=1):
-            resp = call_analyze(
-                client,
-                session_id=session_id,
-                user_input=extra,
-                ocr_texts=step["texts"],
-                dialogue_history=dialogue_history,
-                last_btn=last_btn,
-            )
-            if extra:
-                append_turn(dialogue_history, "user", extra)
+        for (idx, step), resp in zip(group, primary_resps):
+            out.write(f"\n--- {step['name']} ({idx}/{len(screens)}) ---\n")
+            user_inputs = step.get("user_inputs") or [None]
+            primary_input = user_inputs[0]
+
+            if primary_input:
+                append_turn(dialogue_history, "user", primary_input)
             append_turn(dialogue_history, "assistant", resp["response_message"], resp["action"])
             if resp["action"]["type"] == "click_text":
                 last_btn = resp["action"]["params"].get("target_text", last_btn)
-            print_resp(f"추가 발화 {extra_idx}", resp)
-            print_history(dialogue_history)
+            print_resp("analyze", resp, out)
+            warn_offscreen_target(resp, step["texts_set"], out)
+            print_history(dialogue_history, out)
+
+            # Additional user inputs on the same screen (e.g., 되묻기 이후 답변)
+            extra_inputs = user_inputs[1:]
+            for extra_idx, extra in enumerate(extra_inputs, start=1):
+                resp = await call_analyze(
+                    client,
+                    session_id=session_id,
+                    user_input=extra,
+                    ocr_texts=step["texts"],
+                    dialogue_history=dialogue_history,
+                    last_btn=last_btn,
+                )
+                if extra:
+                    append_turn(dialogue_history, "user", extra)
+                append_turn(dialogue_history, "assistant", resp["response_message"], resp["action"])
+                if resp["action"]["type"] == "click_text":
+                    last_btn = resp["action"]["params"].get("target_text", last_btn)
+                print_resp(f"추가 발화 {extra_idx}", resp, out)
+                warn_offscreen_target(resp, step["texts_set"], out)
+                print_history(dialogue_history, out)
+
+
+async def run_buffered(
+    demo: Callable[[httpx.AsyncClient, TextIO], Awaitable[None]], client: httpx.AsyncClient
+) -> None:
+    """Run a demo against its own buffer and emit it as one block, so concurrent demos do not interleave."""
+    out = io.StringIO()
+    try:
+        await demo(client, out)
+    finally:
+        sys.stdout.write(out.getvalue())
+
+
+async def main() -> None:
+    app, client = build_client()
+    async with AsyncExitStack() as stack:
+        await stack.enter_async_context(client)
+        if app is not None:
+            # ASGITransport does not emit lifespan events, so run startup/shutdown here.
+            await stack.enter_async_context(app.router.lifespan_context(app))
+        # 두 데모는 session_id가 달라 상태를 공유하지 않으므로 동시에 실행한다.
+        await asyncio.gather(run_buffered(run_mid_demo, client), run_buffered(run_final_demo, client))
 
 
 if __name__ == "__main__":
-    client = build_client()
-    run_mid_demo(client)
-    run_final_demo(client)
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
     print("\n시나리오 실행 완료 (AI_SERVER_MOCK=%s)" % os.getenv("AI_SERVER_MOCK", "0"))
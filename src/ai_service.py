@@ -1,21 +1,53 @@
 from __future__ import annotations
 
 import asyncio
-import json
+import hashlib
+import importlib.util
 import logging
 import os
-from typing import Any, Dict, List, Sequence
-
+import re
+import sqlite3
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Sequence, Tuple
+
+import httpx
+import orjson
 from openai import AsyncOpenAI
-from openai import OpenAIError
+from openai import APIConnectionError, APITimeoutError, InternalServerError, OpenAIError, RateLimitError
+from pydantic import TypeAdapter
+from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_random_exponential
 
 from .models import AnalyzeRequest, AnalyzeResponse, Action
+from .response_cache import ResponseCache
+from .semantic_cache import SemanticCache
+from .session_memory import SessionMemory
 
 logger = logging.getLogger(__name__)
 
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=100, max_connections=100)
+HTTP_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+# HTTP/2면 동시 요청들이 하나의 연결 위에서 다중화된다. h2 패키지가 없으면 HTTP/1.1로 동작한다.
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# 일시적인 오류(rate limit, 타임아웃/연결 오류, 5xx)만 재시도한다. APITimeoutError는 APIConnectionError의 하위 타입이다.
+RETRIABLE_ERRORS = (RateLimitError, APIConnectionError, InternalServerError)
+MAX_BACKOFF_SECONDS = 4.0
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+# 응답 JSON은 짧은 안내 문장 하나와 action뿐이므로 출력 토큰을 넉넉히 잡아도 이 정도면 충분하다.
+MAX_COMPLETION_TOKENS = 256
+
+
+def _dumps(value: Any) -> str:
+    # orjson은 한글을 이스케이프 없이 UTF-8로 바로 쓴다 (json.dumps의 ensure_ascii=False와 같은 결과).
+    return orjson.dumps(value).decode()
+
 
-SYSTEM_PROMPT = """
-[역할]
+# 시스템 프롬프트와 few-shot 예시는 매 요청 메시지의 맨 앞에 그대로 실린다.
+# OpenAI 프롬프트 캐싱은 바이트 단위로 동일한 접두부에만 적용되므로, 여기에 요청별 값을 끼워 넣지 말 것.
+SYSTEM_PROMPT = """[역할]
 너는 시각 장애인 및 외국인을 위한 키오스크 보조 에이전트이다.
 사용자는 키오스크 화면을 보지 못하거나, 화면의 언어를 이해하지 못할 수 있다.
 너의 목표는 **사용자가 원하는 메뉴를 실수 없이 주문하도록**, 현재 화면에 있는 텍스트(버튼, 메뉴명 등) 중 어떤 것을 눌러야 하는지 안내하는 것이다.
@@ -28,7 +60,6 @@ SYSTEM_PROMPT = """
 
 ```jsonc
 {
-  "session_id": "sess_001",
   "user_input": "불고기 버거 하나",
   "ocr_texts": ["추천메뉴", "불고기버거", "4500원", "치즈버거", "다음"],
   "dialogue_history": [
@@ -48,7 +79,6 @@ SYSTEM_PROMPT = """
 
 각 필드는 다음 의미를 가진다:
 
-* `session_id`: 세션 추적용 ID (출력에는 포함하지 않는다)
 * `user_input`: 최신 사용자 발화 (STT 결과 문자열, 없을 수도 있음)
 * `ocr_texts`: **현재 화면에서 OCR로 추출한 텍스트 문자열 배열**
   예: `["추천메뉴", "불고기버거", "4500원", "치즈버거", "다음"]`
@@ -56,6 +86,8 @@ SYSTEM_PROMPT = """
 
   * 각 항목: `{ "role": "user" | "assistant" | "system", "utterance": string, ... }`
   * 과거 맥락과 사용자의 의도를 이해할 때 참고한다.
+  * 대화가 길어지면 최근 대화만 담기고, 그 이전 대화는 `conversation_summary`로 요약되어 함께 전달된다.
+* `conversation_summary`: 오래된 대화의 요약 (대화가 짧으면 전달되지 않음)
 * `last_btn`: 사용자가 직전에 눌렀던 버튼의 텍스트 (예: `"햄버거"`)
 
   * 흐름 파악을 위한 힌트로만 사용하고, 출력에는 포함하지 않는다.
@@ -284,128 +316,692 @@ JSON 이외의 텍스트, 설명, 마크다운, 코드블록은 절대 출력하
 * 너의 **모든 응답은 위 [출력 형식]에 맞는 JSON 객체 한 개만** 포함해야 한다.
 * JSON 앞뒤에 어떤 설명, 마크다운, 자연어도 붙이면 안 된다.
 * `action.params.target_text`와 `action.params.candidates`에 들어가는 값은 **반드시 `ocr_texts` 배열에 존재하는 문자열만** 사용해야 한다.
-* 사용자가 원하는 메뉴/동작을 최대한 정확하게 추론하되, 확신이 없으면 **과감하게 `ask_clarification`을 사용**해 되물어라.
+* 사용자가 원하는 메뉴/동작을 최대한 정확하게 추론하되, 확신이 없으면 **과감하게 `ask_clarification`을 사용**해 되물어라."""
+
+_SYSTEM_MESSAGE: Dict[str, str] = {"role": "system", "content": SYSTEM_PROMPT}
+
+
+SUMMARY_PROMPT = """
+너는 키오스크 주문 보조 대화를 요약하는 도우미이다.
+이전 요약과 새 대화 턴이 JSON으로 주어진다. 이를 합쳐 한국어로 3문장 이내로 요약하라.
+사용자가 이미 선택한 항목(식사 장소, 메뉴, 세트/단품, 사이드, 소스, 음료 등)과 아직 결정되지 않은 사항을 빠짐없이 남겨라.
+요약문만 출력하라.
 """.strip()
 
 
-def _few_shot_messages() -> List[Dict[str, str]]:
-    examples: List[Dict[str, Any]] = [
-        {
-            "user": {
-                "task": "analyze_kiosk",
-                "user_input": "소고기 들어간 걸로 줘",
-                "available_texts": ["불고기 버거", "치즈 버거", "사이드", "음료"],
-                "dialogue_history": [],
-                "last_btn": None,
-            },
-            "assistant": {
-                "status": "ambiguous",
-                "confidence": 0.62,
-                "response_message": "불고기 버거와 치즈 버거 중 어떤 것을 선택할까요?",
+# few-shot 예시는 리터럴이므로 import 시 미리 JSON 문자열로 직렬화해 둔다.
+_EX1_USER = _dumps(
+    {
+        "task": "analyze_kiosk",
+        "dialogue_history": [],
+        "last_btn": None,
+        "available_texts": ["불고기 버거", "치즈 버거", "사이드", "음료"],
+        "user_input": "소고기 들어간 걸로 줘",
+    }
+)
+_EX1_ASSISTANT = _dumps(
+    {
+        "status": "ambiguous",
+        "confidence": 0.62,
+        "response_message": "불고기 버거와 치즈 버거 중 어떤 것을 선택할까요?",
+        "action": {
+            "type": "ask_clarification",
+            "params": {"candidates": ["불고기 버거", "치즈 버거"]},
+        },
+    }
+)
+
+_EX2_USER = _dumps(
+    {
+        "task": "analyze_kiosk",
+        "dialogue_history": [],
+        "last_btn": "세트 선택",
+        "available_texts": [
+            "후렌치 후라이 -미디엄",
+            "맥너겟 4조각",
+            "골든 모짜렐라 치즈스틱",
+        ],
+        "user_input": "맥너겟 4조각으로 줘",
+    }
+)
+_EX2_ASSISTANT = _dumps(
+    {
+        "status": "success",
+        "confidence": 0.91,
+        "response_message": "맥너겟 4조각 버튼으로 안내하겠습니다. 손가락을 움직이면 목표에 가까워질수록 진동이 빨라집니다.",
+        "action": {"type": "click_text", "params": {"target_text": "맥너겟 4조각"}},
+    }
+)
+
+_EX3_USER = _dumps(
+    {
+        "task": "analyze_kiosk",
+        "dialogue_history": [],
+        "last_btn": "디핑 소스 선택",
+        "available_texts": [
+            "코카콜라- 미디엄",
+            "스프라이트- 미디엄",
+            "환타 - 미디엄",
+            "코카콜라 제로 - 미디엄",
+            "아이스 아메리카노 - 미디엄",
+        ],
+        "user_input": "에스프레소 없어?",
+    }
+)
+_EX3_ASSISTANT = _dumps(
+    {
+        "status": "fail",
+        "confidence": 0.44,
+        "response_message": "에스프레소는 현재 화면에 없습니다. 보이는 음료 중에서 선택하시겠어요?",
+        "action": {"type": "speak_only", "params": {}},
+    }
+)
+
+
+# 응답 검증기는 import 시 한 번만 만든다.
+_RESPONSE_ADAPTER: TypeAdapter[AnalyzeResponse] = TypeAdapter(AnalyzeResponse)
+
+
+def _strict_object(properties: Dict[str, Any]) -> Dict[str, Any]:
+    return {"type": "object", "properties": properties, "required": list(properties), "additionalProperties": False}
+
+
+# Structured Outputs(strict) 스키마. AnalyzeResponse.model_json_schema()를 그대로 쓰지 않는 이유:
+# strict 모드는 모든 객체가 닫혀 있어야 하는데 Action.params는 열린 dict이고, confidence의 범위 제약도 받지 않는다.
+# 그래서 action 타입별 params 형태를 anyOf로 명시한다. confidence 범위는 _construct_response에서 맞춘다.
+ANALYZE_RESPONSE_FORMAT: Dict[str, Any] = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "AnalyzeResponse",
+        "strict": True,
+        "schema": _strict_object(
+            {
+                "status": {"type": "string", "enum": ["success", "ambiguous", "fail"]},
+                "confidence": {"type": "number"},
+                "response_message": {"type": "string"},
                 "action": {
-                    "type": "ask_clarification",
-                    "params": {"candidates": ["불고기 버거", "치즈 버거"]},
+                    "anyOf": [
+                        _strict_object(
+                            {
+                                "type": {"type": "string", "enum": ["click_text"]},
+                                "params": _strict_object({"target_text": {"type": "string"}}),
+                            }
+                        ),
+                        _strict_object(
+                            {
+                                "type": {"type": "string", "enum": ["speak_only"]},
+                                "params": _strict_object({}),
+                            }
+                        ),
+                        _strict_object(
+                            {
+                                "type": {"type": "string", "enum": ["ask_clarification"]},
+                                "params": _strict_object(
+                                    {"candidates": {"type": "array", "items": {"type": "string"}}}
+                                ),
+                            }
+                        ),
+                    ]
                 },
-            },
-        },
-        {
-            "user": {
-                "task": "analyze_kiosk",
-                "user_input": "맥너겟 4조각으로 줘",
-                "available_texts": [
-                    "후렌치 후라이 -미디엄",
-                    "맥너겟 4조각",
-                    "골든 모짜렐라 치즈스틱",
-                ],
-                "dialogue_history": [],
-                "last_btn": "세트 선택",
-            },
-            "assistant": {
-                "status": "success",
-                "confidence": 0.91,
-                "response_message": "맥너겟 4조각 버튼으로 안내하겠습니다. 손가락을 움직이면 목표에 가까워질수록 진동이 빨라집니다.",
-                "action": {"type": "click_text", "params": {"target_text": "맥너겟 4조각"}},
-            },
-        },
-        {
-            "user": {
-                "task": "analyze_kiosk",
-                "user_input": "에스프레소 없어?",
-                "available_texts": [
-                    "코카콜라- 미디엄",
-                    "스프라이트- 미디엄",
-                    "환타 - 미디엄",
-                    "코카콜라 제로 - 미디엄",
-                    "아이스 아메리카노 - 미디엄",
-                ],
-                "dialogue_history": [],
-                "last_btn": "디핑 소스 선택",
-            },
-            "assistant": {
-                "status": "fail",
-                "confidence": 0.44,
-                "response_message": "에스프레소는 현재 화면에 없습니다. 보이는 음료 중에서 선택하시겠어요?",
-                "action": {"type": "speak_only", "params": {}},
-            },
-        },
-    ]
+            }
+        ),
+    },
+}
+
+# 여러 요청을 한 번에 보낼 때의 응답 스키마. results[i]는 requests[i]에 대한 AnalyzeResponse이다.
+BATCH_RESPONSE_FORMAT: Dict[str, Any] = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "AnalyzeBatchResponse",
+        "strict": True,
+        "schema": _strict_object(
+            {"results": {"type": "array", "items": ANALYZE_RESPONSE_FORMAT["json_schema"]["schema"]}}
+        ),
+    },
+}
 
-    messages: List[Dict[str, str]] = [{"role": "system", "content": SYSTEM_PROMPT}]
-    for example in examples:
-        messages.append({"role": "user", "content": json.dumps(example["user"], ensure_ascii=False)})
-        messages.append({"role": "assistant", "content": json.dumps(example["assistant"], ensure_ascii=False)})
+BATCH_PROMPT = """이번 입력은 여러 요청을 묶은 것이다. `requests` 배열의 각 항목은 서로 독립적인 단건 입력이다.
+각 항목을 다른 항목의 내용과 섞지 말고 단건일 때와 똑같이 분석하라.
+출력은 `{"results": [...]}` 형태의 JSON 객체 하나이며, `results[i]`는 `requests[i]`에 대한 [출력 형식]의 객체이다.
+`results`의 길이와 순서는 `requests`와 같아야 한다."""
+
+_BATCH_SYSTEM_MESSAGE: Dict[str, str] = {"role": "system", "content": BATCH_PROMPT}
+
+
+@dataclass
+class _Pending:
+    """캐시 등에서 끝나지 않아 LLM에 보내야 하는 요청과 그 맥락."""
+
+    payload: AnalyzeRequest
+    summary: str
+    recent_turns: str
+    scope_key: bytes
+    cache_key: bytes
+    vector: List[float] | None
+
+
+def _failed_request(exc: httpx.TransportError) -> httpx.Request:
+    try:
+        return exc.request
+    except RuntimeError:  # 요청 정보 없이 올라온 예외
+        return httpx.Request("POST", "/chat/completions")
+
+
+def _normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", text).split()).casefold()
+
+
+_STATUSES = frozenset(("success", "ambiguous", "fail"))
+_ACTION_TYPES = frozenset(("click_text", "speak_only", "ask_clarification"))
+
+
+def _construct_response(parsed: Any) -> AnalyzeResponse:
+    """strict 스키마를 통과한 출력은 Pydantic 검증 없이 바로 조립한다.
+
+    형태가 예상과 다르면(스키마를 쓰지 않는 모델 등) 전체 검증으로 넘어가 ValidationError를 낸다.
+    """
+    try:
+        action = parsed["action"]
+        if parsed["status"] in _STATUSES and action["type"] in _ACTION_TYPES and type(action["params"]) is dict:
+            return AnalyzeResponse.model_construct(
+                status=parsed["status"],
+                confidence=min(1.0, max(0.0, float(parsed["confidence"]))),
+                response_message=str(parsed["response_message"]),
+                action=Action.model_construct(type=action["type"], params=action["params"]),
+            )
+    except (KeyError, TypeError, ValueError):
+        pass
+    return _RESPONSE_ADAPTER.validate_python(parsed)
+
+
+def _match_key(text: str) -> str:
+    # "불고기 버거"와 "불고기버거"처럼 띄어쓰기만 다른 경우도 같은 버튼으로 본다.
+    return _normalize_text(text).replace(" ", "")
+
+
+def _resolve_targets(response: AnalyzeResponse, screen_texts: Sequence[str]) -> AnalyzeResponse | None:
+    """click_text/ask_clarification이 가리키는 텍스트를 실제 화면 문자열로 맞춘다.
+
+    정규화(NFKC, 공백, 대소문자)해서 같은 화면 텍스트가 있으면 그 문자열로 바꾸고,
+    화면에 전혀 없는 후보는 버린다. 남는 대상이 없으면 None을 반환한다.
+    """
+    action = response.action
+    if action.type == "click_text":
+        targets = [action.params.get("target_text")]
+    elif action.type == "ask_clarification":
+        targets = action.params.get("candidates") or []
+    else:
+        return response
+
+    exact = frozenset(screen_texts)
+    by_key: Dict[str, str] = {}
+    for text in screen_texts:
+        by_key.setdefault(_match_key(text), text)
+    resolved: List[str] = []
+    corrected: List[Tuple[str, str]] = []
+    dropped: List[Any] = []
+    for target in targets:
+        text = None
+        if isinstance(target, str):
+            text = target if target in exact else by_key.get(_match_key(target))
+        if text is None:
+            dropped.append(target)
+            continue
+        if text != target:
+            corrected.append((target, text))
+        if text not in resolved:
+            resolved.append(text)
+    if resolved == targets:
+        return response
+
+    if dropped:
+        logger.warning("화면에 없는 대상 텍스트를 버림: %s", dropped)
+    if corrected:
+        logger.info("화면 텍스트와 정규화 일치로 대상 보정: %s", corrected)
+    if not resolved:
+        return None
+    params = {"target_text": resolved[0]} if action.type == "click_text" else {"candidates": resolved}
+    return AnalyzeResponse.model_construct(
+        status=response.status,
+        confidence=response.confidence,
+        response_message=response.response_message,
+        action=Action.model_construct(type=action.type, params=params),
+    )
+
+
+class _ReplyFieldParser:
+    """스트리밍으로 도착하는 응답 JSON에서 status, confidence, response_message를 완성되는 대로 꺼낸다.
+
+    JSON 전체를 매번 다시 파싱하지 않고 필드 시작 위치만 찾는다.
+    response_message는 도착한 만큼 조각(delta)으로 내보내 TTS를 먼저 시작할 수 있게 한다.
+    """
+
+    _STATUS = re.compile(r'"status"\s*:\s*"(\w+)"')
+    _CONFIDENCE = re.compile(r'"confidence"\s*:\s*(-?[0-9.eE+-]+)\s*[,}]')
+    _MESSAGE = re.compile(r'"response_message"\s*:\s*"')
+
+    def __init__(self) -> None:
+        self.buffer = ""
+        self.emitted = False
+        self._status_done = False
+        self._confidence_done = False
+        self._message_start: int | None = None
+        self._message_done = False
+        self._message_sent = 0
+
+    def feed(self, delta: str) -> List[Tuple[str, Any]]:
+        self.buffer += delta
+        events: List[Tuple[str, Any]] = []
+        if not self._status_done:
+            match = self._STATUS.search(self.buffer)
+            if match:
+                self._status_done = True
+                events.append(("status", match.group(1)))
+        if not self._confidence_done:
+            match = self._CONFIDENCE.search(self.buffer)
+            if match:
+                self._confidence_done = True
+                try:
+                    events.append(("confidence", min(1.0, max(0.0, float(match.group(1))))))
+                except ValueError:
+                    pass
+        if not self._message_done:
+            text = self._message_text()
+            if text is not None and len(text) > self._message_sent:
+                events.append(("response_message", text[self._message_sent :]))
+                self._message_sent = len(text)
+        self.emitted = self.emitted or bool(events)
+        return events
+
+    def _message_text(self) -> str | None:
+        if self._message_start is None:
+            match = self._MESSAGE.search(self.buffer)
+            if not match:
+                return None
+            self._message_start = match.end()
+        raw = self.buffer[self._message_start :]
+        escaped = False
+        for index, char in enumerate(raw):
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                self._message_done = True
+                return orjson.loads(f'"{raw[:index]}"')
+        # 끝이 잘린 이스케이프(`\` 또는 `\uAB` 등)는 다음 조각이 올 때까지 남겨 둔다.
+        for cut in range(len(raw), max(len(raw) - 6, 0) - 1, -1):
+            try:
+                return orjson.loads(f'"{raw[:cut]}"')
+            except orjson.JSONDecodeError:
+                continue
+        return None
+
+
+def _build_base_messages() -> List[Dict[str, str]]:
+    examples = [
+        (_EX1_USER, _EX1_ASSISTANT),
+        (_EX2_USER, _EX2_ASSISTANT),
+        (_EX3_USER, _EX3_ASSISTANT),
+    ]
+    messages: List[Dict[str, str]] = [_SYSTEM_MESSAGE]
+    for user_content, assistant_content in examples:
+        messages.append({"role": "user", "content": user_content})
+        messages.append({"role": "assistant", "content": assistant_content})
     return messages
 
 
+# 시스템 프롬프트와 few-shot 예시는 고정이므로 import 시 한 번만 만든다.
+_BASE_MESSAGES: Tuple[Dict[str, str], ...] = tuple(_build_base_messages())
+
+
 class AIService:
-    def __init__(self, model: str, mock: bool = False, client: AsyncOpenAI | None = None, max_retries: int = 2):
+    def __init__(
+        self,
+        model: str,
+        mock: bool = False,
+        client: AsyncOpenAI | None = None,
+        max_retries: int = 2,
+        history_window: int = 6,
+        cache_size: int = 1024,
+        semantic_cache_threshold: float | None = None,
+        max_concurrency: int = 32,
+        persistent_cache_path: str | None = None,
+    ):
         api_key = os.getenv("OPENAI_API_KEY")
         self.mock = mock or not api_key
         self.model = model
         self.max_retries = max_retries
+        self.memory = SessionMemory(summarizer=self._summarize, window=history_window)
+        self.cache_size = cache_size
+        # 트래픽이 몰려도 OpenAI로 나가는 동시 요청 수를 제한해 rate limit과 커넥션 고갈을 막는다.
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._cache: "OrderedDict[bytes, AnalyzeResponse]" = OrderedDict()
+        self._inflight: Dict[bytes, "asyncio.Task[AnalyzeResponse]"] = {}
         self.client = client if not self.mock else None
         if not self.mock and api_key:
-            self.client = client or AsyncOpenAI(api_key=api_key)
+            # 프로세스당 하나의 커넥션 풀을 재사용하도록 httpx 클라이언트를 직접 구성한다.
+            self.client = client or AsyncOpenAI(
+                api_key=api_key,
+                http_client=httpx.AsyncClient(http2=HTTP2_AVAILABLE, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT),
+                max_retries=0,  # 재시도는 analyze()에서 직접 관리한다.
+            )
         elif not api_key and not mock:
             logger.warning("OPENAI_API_KEY가 설정되지 않아 mock 모드로 동작합니다.")
+        self.semantic_cache: SemanticCache | None = None
+        if self.client is not None and semantic_cache_threshold is not None:
+            self.semantic_cache = SemanticCache(embed=self._embed, threshold=semantic_cache_threshold)
+        self.persistent_cache: ResponseCache | None = None
+        if self.client is not None and persistent_cache_path:
+            # 모델이나 프롬프트·스키마가 바뀌면 이전 응답을 재사용하지 않도록 키에 지문을 붙인다.
+            fingerprint = _dumps([model, _BASE_MESSAGES, ANALYZE_RESPONSE_FORMAT, MAX_COMPLETION_TOKENS])
+            try:
+                self.persistent_cache = ResponseCache(
+                    persistent_cache_path, namespace=hashlib.blake2b(fingerprint.encode(), digest_size=8).digest()
+                )
+            except (OSError, sqlite3.Error) as exc:
+                logger.warning("영구 캐시를 열지 못해 메모리 캐시만 사용합니다 (%s): %s", persistent_cache_path, exc)
+
+    async def aclose(self) -> None:
+        await self.memory.aclose()
+        if self.semantic_cache is not None:
+            await self.semantic_cache.aclose()
+        if self.persistent_cache is not None:
+            self.persistent_cache.close()
+        if self.client is not None:
+            await self.client.close()
 
     async def analyze(self, payload: AnalyzeRequest) -> AnalyzeResponse:
-        if self.mock:
-            return self._mock_response(payload)
-
-        messages = self._build_messages(payload)
-        for attempt in range(1, self.max_retries + 1):
+        resolved, pending = await self._prepare(payload)
+        if pending is None:
+            return resolved
+        return await self._analyze_once(pending)
+
+    async def analyze_batch(self, payloads: Sequence[AnalyzeRequest]) -> List[AnalyzeResponse]:
+        """여러 요청을 한 번의 completion으로 분석한다. 결과 순서는 입력 순서와 같다."""
+        results: List[AnalyzeResponse | None] = []
+        pending: List[Tuple[int, _Pending]] = []
+        for index, payload in enumerate(payloads):
+            resolved, item = await self._prepare(payload)
+            results.append(resolved)
+            if item is not None:
+                pending.append((index, item))
+
+        # 규칙·mock·캐시로 끝나지 않은 요청이 둘 이상일 때만 묶고, 실패한 요청은 개별 경로로 다시 처리한다.
+        if len(pending) > 1:
             try:
-                completion = await self.client.chat.completions.create(
-                    model=self.model,
-                    temperature=0.3,
-                    response_format={"type": "json_object"},
-                    messages=messages,
+                content = await self._complete(
+                    self._build_batch_messages([item for _, item in pending]),
+                    BATCH_RESPONSE_FORMAT,
+                    MAX_COMPLETION_TOKENS * len(pending),
                 )
-                content = completion.choices[0].message.content or "{}"
-                parsed = json.loads(content)
-                return AnalyzeResponse.model_validate(parsed)
-            except (OpenAIError, json.JSONDecodeError, ValueError) as exc:
-                if attempt < self.max_retries:
-                    # 테스트 실행 시 connection error 경고가 과도하게 출력되어 주석 처리
-                    # logger.warning("AI 분석 재시도 (%s/%s): %s", attempt, self.max_retries, exc)
-                    await asyncio.sleep(0.5 * attempt)
-                    continue
+                batch = orjson.loads(content)["results"]
+                if len(batch) != len(pending):
+                    raise ValueError(f"묶음 응답 개수 불일치: {len(batch)} != {len(pending)}")
+            except (OpenAIError, orjson.JSONDecodeError, KeyError, TypeError, ValueError) as exc:
+                logger.warning("묶음 분석 실패, 개별 분석으로 전환: %s", exc)
+            else:
+                retry: List[Tuple[int, _Pending]] = []
+                for (index, item), parsed in zip(pending, batch):
+                    try:
+                        results[index] = self._accept(item, parsed)
+                    except ValueError as exc:
+                        logger.warning("묶음 응답 검증 실패, 개별 분석으로 전환: %s", exc)
+                        retry.append((index, item))
+                pending = retry
+
+        responses = await asyncio.gather(*(self._analyze_once(item) for _, item in pending))
+        for (index, _), response in zip(pending, responses):
+            results[index] = response
+        return results
+
+    async def _prepare(self, payload: AnalyzeRequest) -> Tuple[AnalyzeResponse | None, _Pending | None]:
+        """LLM 없이 끝나는 요청(규칙·mock·캐시)은 응답을, 아니면 LLM 호출에 필요한 맥락을 반환한다."""
+        rule_response = self._rule_based_response(payload)
+        if rule_response is not None:
+            return rule_response, None
+        if self.mock:
+            return self._mock_response(payload), None
+
+        # 턴 직렬화는 세션 메모리가 새 턴에 대해서만 한 번씩 해 둔다.
+        summary, recent_turns = self.memory.context(payload.session_id, payload.dialogue_history)
+
+        scope_key, cache_key = self._cache_keys(payload, summary, recent_turns)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            self._cache.move_to_end(cache_key)
+            return cached, None
+        if self.persistent_cache is not None:
+            cached = self.persistent_cache.get(cache_key)
+            if cached is not None:
+                self._remember(cache_key, cached)
+                return cached, None
+
+        vector = None
+        if self.semantic_cache is not None and payload.user_input:
+            cached, vector = await self.semantic_cache.lookup(scope_key, payload.user_input)
+            if cached is not None:
+                self._remember(cache_key, cached)
+                return cached, None
+
+        return None, _Pending(payload, summary, recent_turns, scope_key, cache_key, vector)
+
+    async def _analyze_once(self, pending: _Pending) -> AnalyzeResponse:
+        """같은 캐시 키로 동시에 들어온 요청들은 OpenAI 호출 하나의 결과를 나눠 받는다 (single-flight)."""
+        key = pending.cache_key
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._analyze_pending(pending))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # 먼저 온 요청이 취소돼도(클라이언트 연결 종료 등) 함께 기다리는 요청에는 영향이 없도록 한다.
+        return await asyncio.shield(task)
+
+    async def _analyze_pending(self, pending: _Pending) -> AnalyzeResponse:
+        payload = pending.payload
+        messages = self._build_messages(payload, pending.summary, pending.recent_turns)
+        try:
+            # 일시적인 오류만 full jitter 지수 백오프로 재시도한다.
+            # 테스트 실행 시 connection error 경고가 과도하게 출력되어 재시도 로그는 남기지 않는다.
+            async for attempt in AsyncRetrying(
+                retry=retry_if_exception_type(RETRIABLE_ERRORS),
+                wait=wait_random_exponential(multiplier=0.2, max=MAX_BACKOFF_SECONDS),
+                stop=stop_after_attempt(self.max_retries),
+                reraise=True,
+            ):
+                with attempt:
+                    content = await self._complete(messages)
+            return self._accept(pending, orjson.loads(content))
+        except (OpenAIError, orjson.JSONDecodeError, ValueError) as exc:
+            # 재시도를 다 쓴 일시적 오류, 인증/요청 오류, JSON·스키마 오류는 기본 응답으로 대신한다.
+            logger.exception("AI 분석 실패: %s", exc)
+            return self._fallback_response(payload, error=str(exc))
+
+    def _accept(self, pending: _Pending, parsed: Any) -> AnalyzeResponse:
+        """모델 출력을 검증하고 대상 텍스트를 화면 문자열로 맞춰 캐시에 넣는다. 형식이 잘못되면 ValidationError를 던진다."""
+        payload = pending.payload
+        response = _resolve_targets(_construct_response(parsed), payload.ocr_texts)
+        if response is None:
+            # 모델의 안내 문장은 화면에 없는 버튼을 말하므로 읽어 주지 않는다. 다음 요청에서 다시 분석하도록 캐시하지 않는다.
+            logger.warning("화면에 없는 버튼만 가리켜 실패 응답으로 대신함")
+            return AnalyzeResponse(
+                status="fail",
+                confidence=0.2,
+                response_message="화면에서 해당 버튼을 찾지 못했습니다. 원하시는 메뉴를 다시 말씀해 주세요.",
+                action=Action(type="speak_only", params={}),
+            )
+        self._remember(pending.cache_key, response)
+        if self.persistent_cache is not None:
+            self.persistent_cache.put(pending.cache_key, response)
+        if self.semantic_cache is not None and payload.user_input:
+            self.semantic_cache.store(pending.scope_key, payload.user_input, response, pending.vector)
+        return response
+
+    async def analyze_stream(self, payload: AnalyzeRequest) -> AsyncIterator[Tuple[str, Any]]:
+        """분석 결과를 (이벤트 이름, 값) 형태로 도착하는 대로 내보낸다.
+
+        LLM을 호출하는 경우 status, confidence, response_message(조각)를 먼저 내보내고,
+        마지막에 항상 검증된 전체 응답을 "result"로 내보낸다. 앞선 조각과 result가 다르면 result가 우선이다.
+        """
+        resolved, pending = await self._prepare(payload)
+        if pending is None:
+            yield "result", resolved
+            return
+
+        parser = _ReplyFieldParser()
+        try:
+            async for delta in self._stream_deltas(self._build_messages(payload, pending.summary, pending.recent_turns)):
+                for event in parser.feed(delta):
+                    yield event
+            response = self._accept(pending, orjson.loads(parser.buffer or "{}"))
+        except RETRIABLE_ERRORS as exc:
+            if parser.emitted:
                 logger.exception("AI 분석 실패: %s", exc)
-                return self._fallback_response(payload, error=str(exc))
-
-    def _build_messages(self, payload: AnalyzeRequest) -> Sequence[Dict[str, Any]]:
-        base_messages = _few_shot_messages()
-        user_payload: Dict[str, Any] = {
-            "task": "analyze_kiosk",
-            "session_id": payload.session_id,
-            "user_input": payload.user_input or "",
-            "available_texts": payload.ocr_texts,
-            "dialogue_history": [turn.model_dump() for turn in payload.dialogue_history],
-            "last_btn": payload.last_btn,
-        }
-        base_messages.append({"role": "user", "content": json.dumps(user_payload, ensure_ascii=False)})
-        return base_messages
+                response = self._fallback_response(payload, error=str(exc))
+            else:
+                # 아직 아무것도 내보내지 않았으면 재시도가 있는 일반 경로로 다시 분석한다.
+                response = await self._analyze_once(pending)
+        except (OpenAIError, orjson.JSONDecodeError, ValueError) as exc:
+            logger.exception("AI 분석 실패: %s", exc)
+            response = self._fallback_response(payload, error=str(exc))
+        yield "result", response
+
+    async def _complete(
+        self,
+        messages: Sequence[Dict[str, Any]],
+        response_format: Dict[str, Any] = ANALYZE_RESPONSE_FORMAT,
+        max_completion_tokens: int = MAX_COMPLETION_TOKENS,
+    ) -> str:
+        chunks = [delta async for delta in self._stream_deltas(messages, response_format, max_completion_tokens)]
+        return "".join(chunks) or "{}"
+
+    async def _stream_deltas(
+        self,
+        messages: Sequence[Dict[str, Any]],
+        response_format: Dict[str, Any] = ANALYZE_RESPONSE_FORMAT,
+        max_completion_tokens: int = MAX_COMPLETION_TOKENS,
+    ) -> AsyncIterator[str]:
+        """응답을 스트리밍으로 받아 조각별로 내보내고, JSON이 아닌 출력이 시작되면 바로 중단한다."""
+        # 스트림을 끝까지 읽는 동안 연결을 쥐고 있으므로 세마포어도 그동안 유지한다.
+        async with self._semaphore:
+            stream = await self.client.chat.completions.create(
+                model=self.model,
+                temperature=0,
+                top_p=1,
+                seed=0,
+                max_completion_tokens=max_completion_tokens,
+                response_format=response_format,
+                messages=messages,
+                stream=True,
+            )
+            head = ""
+            try:
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if not delta:
+                        continue
+                    if head is not None:
+                        head = (head + delta).lstrip()
+                        if not head:
+                            continue
+                        if not head.startswith("{"):
+                            await stream.close()
+                            raise ValueError(f"JSON 객체가 아닌 응답: {head[:40]!r}")
+                        head = None
+                    yield delta
+            # 스트림 도중 끊기면 httpx 예외가 그대로 올라오므로, SDK 예외로 바꿔 재시도·폴백 경로를 타게 한다.
+            except httpx.TimeoutException as exc:
+                raise APITimeoutError(request=_failed_request(exc)) from exc
+            except httpx.TransportError as exc:
+                raise APIConnectionError(request=_failed_request(exc)) from exc
+
+    def _cache_keys(self, payload: AnalyzeRequest, summary: str, recent_turns: str) -> Tuple[bytes, bytes]:
+        """(화면·대화 맥락 키, 맥락 + 발화 키)를 만든다.
+
+        프롬프트에 실제로 들어가는 내용(session_id 제외)이 같으면 같은 응답을 재사용한다.
+        OCR 텍스트는 순서만 다른 경우도 같은 화면으로 본다.
+        """
+        material = _dumps([sorted(payload.ocr_texts), payload.last_btn, summary, orjson.Fragment(recent_turns)])
+        digest = hashlib.blake2b(material.encode(), digest_size=16)
+        scope_key = digest.digest()
+        digest.update(_dumps(payload.user_input).encode())
+        return scope_key, digest.digest()
+
+    def _remember(self, key: bytes, response: AnalyzeResponse) -> None:
+        self._cache[key] = response
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _build_messages(self, payload: AnalyzeRequest, summary: str, recent_turns: str) -> Sequence[Dict[str, Any]]:
+        user_payload = self._user_payload(payload, summary, recent_turns)
+        return (*_BASE_MESSAGES, {"role": "user", "content": _dumps(user_payload)})
+
+    def _build_batch_messages(self, items: Sequence[_Pending]) -> Sequence[Dict[str, Any]]:
+        requests = [self._user_payload(item.payload, item.summary, item.recent_turns) for item in items]
+        # 고정 접두부(_BASE_MESSAGES)는 단건 요청과 같게 두고, 묶음 지시는 그 뒤에 붙인다.
+        return (
+            *_BASE_MESSAGES,
+            _BATCH_SYSTEM_MESSAGE,
+            {"role": "user", "content": _dumps({"task": "analyze_kiosk_batch", "requests": requests})},
+        )
+
+    @staticmethod
+    def _user_payload(payload: AnalyzeRequest, summary: str, recent_turns: str) -> Dict[str, Any]:
+        # 세션 안에서 잘 바뀌지 않는 필드를 앞에, 요청마다 바뀌는 필드를 뒤에 둬서 캐시 가능한 접두부를 늘린다.
+        # session_id는 모델에 필요 없고 요청마다 달라 캐시를 깨뜨리므로 넣지 않는다.
+        user_payload: Dict[str, Any] = {"task": "analyze_kiosk"}
+        if summary:
+            user_payload["conversation_summary"] = summary
+        # 이미 직렬화된 JSON 배열이므로 다시 인코딩하지 않고 그대로 끼워 넣는다.
+        user_payload["dialogue_history"] = orjson.Fragment(recent_turns)
+        user_payload["last_btn"] = payload.last_btn
+        user_payload["available_texts"] = payload.ocr_texts
+        user_payload["user_input"] = payload.user_input or ""
+        return user_payload
+
+    async def _embed(self, text: str) -> List[float]:
+        result = await self.client.embeddings.create(model=EMBEDDING_MODEL, input=text)
+        return result.data[0].embedding
+
+    async def _summarize(self, summary: str, turns: str) -> str:
+        async with self._semaphore:
+            completion = await self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": SUMMARY_PROMPT},
+                    {"role": "user", "content": _dumps({"previous_summary": summary, "turns": orjson.Fragment(turns)})},
+                ],
+            )
+        return (completion.choices[0].message.content or summary).strip()
+
+    def _rule_based_response(self, payload: AnalyzeRequest) -> AnalyzeResponse | None:
+        """LLM 없이 결정할 수 있는 요청(화면 텍스트를 그대로 말한 경우 등)은 바로 응답한다."""
+        user_input = _normalize_text(payload.user_input or "")
+        if not user_input:
+            if payload.dialogue_history:
+                # 이전 대화에서 의도를 추론해야 하므로 LLM에 맡긴다.
+                return None
+            return AnalyzeResponse(
+                status="success",
+                confidence=0.9,
+                response_message="화면이 인식되었습니다. 원하시는 메뉴나 버튼을 말씀해 주세요.",
+                action=Action(type="speak_only", params={}),
+            )
+
+        matches = {text for text in payload.ocr_texts if _normalize_text(text) == user_input}
+        if len(matches) != 1:
+            return None
+        target = matches.pop()
+        message = f"{target} 버튼으로 안내하겠습니다. 손가락을 움직이면 목표에 가까워질수록 진동이 빨라집니다."
+        return AnalyzeResponse(
+            status="success",
+            confidence=0.99,
+            response_message=message,
+            action=Action(type="click_text", params={"target_text": target}),
+        )
 
     def _mock_response(self, payload: AnalyzeRequest) -> AnalyzeResponse:
         target = payload.ocr_texts[0] if payload.ocr_texts else None
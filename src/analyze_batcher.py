@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import List, Optional, Set, Tuple
+
+from .ai_service import AIService
+from .models import AnalyzeRequest, AnalyzeResponse
+
+logger = logging.getLogger(__name__)
+
+_Item = Tuple[AnalyzeRequest, "asyncio.Future[AnalyzeResponse]"]
+
+
+class AnalyzeBatcher:
+    """짧은 시간 창(window) 안에 들어온 analyze 요청을 모아 `AIService.analyze_batch`로 한 번에 보낸다."""
+
+    def __init__(self, ai_service: AIService, window: float = 0.015, max_batch: int = 8):
+        self.ai_service = ai_service
+        self.window = window
+        self.max_batch = max_batch
+        self._queue: "asyncio.Queue[_Item]" = asyncio.Queue()
+        self._worker: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, payload: AnalyzeRequest) -> AnalyzeResponse:
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+        future: "asyncio.Future[AnalyzeResponse]" = asyncio.get_running_loop().create_future()
+        await self._queue.put((payload, future))
+        return await future
+
+    async def aclose(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            future.cancel()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            # 첫 요청부터 window초 동안(또는 max_batch개가 찰 때까지) 모은다.
+            batch: List[_Item] = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # 다음 묶음을 모으는 동안 이번 묶음의 OpenAI 호출이 진행되도록 별도 태스크로 보낸다.
+            task = asyncio.create_task(self._flush(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _flush(self, batch: List[_Item]) -> None:
+        try:
+            responses = await self.ai_service.analyze_batch([payload for payload, _ in batch])
+        except Exception as exc:  # 호출자에게 그대로 전달한다.
+            logger.exception("묶음 분석 실패: %s", exc)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+        else:
+            for (_, future), response in zip(batch, responses):
+                if not future.done():
+                    future.set_result(response)
+        finally:
+            # 종료 중 취소된 경우 기다리는 호출자가 남지 않게 한다.
+            for _, future in batch:
+                if not future.done():
+                    future.cancel()
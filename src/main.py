@@ -1,13 +1,16 @@
 from __future__ import annotations
 
+import functools
 import logging
 import os
 from typing import Optional
 
+import orjson
 from dotenv import load_dotenv
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 
 from .ai_service import AIService
 from .models import AnalyzeRequest, AnalyzeResponse, ScreenDetectRequest, ScreenDetectResponse
@@ -18,7 +21,7 @@ load_dotenv()  # Load variables from .env if present
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="KiMate-AI Server", version="0.1.0")
+app = FastAPI(title="KiMate-AI Server", version="0.1.0", default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -29,20 +32,67 @@ app.add_middleware(
 )
 
 
+# 워커 프로세스마다 한 번만 만들어 앱 수명 동안 공유한다 (OpenAI 클라이언트, 세마포어, 캐시가 하나씩만 존재하도록).
+@functools.lru_cache(maxsize=1)
 def _init_ai_service() -> AIService:
     model = os.getenv("OPENAI_MODEL", "gpt-5.1")
     mock = os.getenv("AI_SERVER_MOCK", "0") == "1"
-    logger.info("AI service init - model=%s mock=%s", model, mock)
-    return AIService(model=model, mock=mock)
-
-
+    history_window = int(os.getenv("DIALOGUE_HISTORY_WINDOW", "6"))
+    max_concurrency = int(os.getenv("OPENAI_MAX_CONCURRENCY", "32"))
+    # 빈 문자열이면 영구 캐시를 끈다.
+    persistent_cache_path = os.getenv("AI_CACHE_PATH", "/var/cache/kimate/analyze.sqlite") or None
+    semantic_cache_threshold: Optional[float] = None
+    if os.getenv("AI_SEMANTIC_CACHE", "0") == "1":
+        semantic_cache_threshold = float(os.getenv("AI_SEMANTIC_CACHE_THRESHOLD", "0.95"))
+    logger.info(
+        "AI service init - model=%s mock=%s history_window=%s semantic_cache_threshold=%s max_concurrency=%s "
+        "persistent_cache_path=%s",
+        model,
+        mock,
+        history_window,
+        semantic_cache_threshold,
+        max_concurrency,
+        persistent_cache_path,
+    )
+    return AIService(
+        model=model,
+        mock=mock,
+        history_window=history_window,
+        semantic_cache_threshold=semantic_cache_threshold,
+        max_concurrency=max_concurrency,
+        persistent_cache_path=persistent_cache_path,
+    )
+
+
+@functools.lru_cache(maxsize=1)
 def _init_screen_detector(ai_service: AIService) -> ScreenDetector:
     threshold = float(os.getenv("SCREEN_CHANGE_THRESHOLD", "0.6"))
-    return ScreenDetector(ai_service=ai_service, threshold=threshold)
+    batch_window = float(os.getenv("SCREEN_DETECT_BATCH_WINDOW_MS", "0")) / 1000
+    return ScreenDetector(ai_service=ai_service, threshold=threshold, batch_window=batch_window)
+
+
+@app.on_event("startup")
+async def startup() -> None:
+    # 요청마다 만들지 않고 앱 수명 동안 하나의 AIService(OpenAI 커넥션 풀)를 공유한다.
+    app.state.ai_service = _init_ai_service()
+    app.state.screen_detector = _init_screen_detector(app.state.ai_service)
+
+
+@app.on_event("shutdown")
+async def shutdown() -> None:
+    await app.state.screen_detector.aclose()
+    await app.state.ai_service.aclose()
+    # 닫힌 클라이언트를 다음 startup에서 재사용하지 않도록 비운다.
+    _init_screen_detector.cache_clear()
+    _init_ai_service.cache_clear()
 
 
-ai_service = _init_ai_service()
-screen_detector = _init_screen_detector(ai_service)
+def get_ai_service(request: Request) -> AIService:
+    return request.app.state.ai_service
+
+
+def get_screen_detector(request: Request) -> ScreenDetector:
+    return request.app.state.screen_detector
 
 
 @app.get("/healthz")
@@ -51,16 +101,33 @@ async def health() -> dict:
 
 
 @app.post("/api/analyze", response_model=AnalyzeResponse)
-async def analyze(req: AnalyzeRequest) -> AnalyzeResponse:
+async def analyze(req: AnalyzeRequest, ai_service: AIService = Depends(get_ai_service)) -> AnalyzeResponse:
     return await ai_service.analyze(req)
 
 
+@app.post("/api/analyze/stream")
+async def analyze_stream(req: AnalyzeRequest, ai_service: AIService = Depends(get_ai_service)) -> StreamingResponse:
+    async def events():
+        # status, confidence, response_message 조각을 먼저 보내고 마지막에 전체 응답(result)을 보낸다.
+        async for event, value in ai_service.analyze_stream(req):
+            data = value.model_dump_json() if event == "result" else orjson.dumps(value).decode()
+            yield f"event: {event}\ndata: {data}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
 @app.post("/api/screen/detect", response_model=ScreenDetectResponse)
-async def screen_detect(req: ScreenDetectRequest) -> ScreenDetectResponse:
+async def screen_detect(
+    req: ScreenDetectRequest, screen_detector: ScreenDetector = Depends(get_screen_detector)
+) -> ScreenDetectResponse:
     return await screen_detector.detect(req)
 
 
 if __name__ == "__main__":
+    import importlib.util
+
     import uvicorn
 
-    uvicorn.run("src.main:app", host="0.0.0.0", port=int(os.getenv("PORT", "8000")), reload=True)
+    # uvloop이 설치되어 있으면 libuv 기반 이벤트 루프를 사용한다 (Windows 미지원).
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    uvicorn.run("src.main:app", host="0.0.0.0", port=int(os.getenv("PORT", "8000")), reload=True, loop=loop)
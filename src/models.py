@@ -1,34 +1,49 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Literal, Optional
+import sys
+from typing import Annotated, Any, Dict, List, Literal, Optional
 
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, BeforeValidator, ConfigDict, Field, field_validator
+
+# 응답 모델은 만들어진 뒤 수정하지 않으며(캐시에서 그대로 공유됨), 추가 필드는 무시한다.
+_RESPONSE_CONFIG = ConfigDict(extra="ignore", frozen=True)
+
+
+# OCR 텍스트 목록: null은 빈 목록으로 받는다. OCR 결과는 종류가 제한되지 않으므로 intern하지 않는다.
+# 검증기는 모델 클래스가 아닌 타입에 붙어 있어 스키마 빌드 시 한 번만 연결된다.
+OcrTexts = Annotated[List[str], BeforeValidator(lambda value: value or [])]
 
 
 class DialogueTurn(BaseModel):
     role: Literal["user", "assistant"]
     utterance: str
-    action: Optional[Dict[str, Any]] = None
+    # 내용은 해석하지 않고 프롬프트에 그대로 넘기므로 키 타입 검사 없이 dict로만 받는다.
+    action: Optional[dict] = None
+
+    # 발화 내용은 종류가 무한하므로 intern하지 않는다 (3.12부터 intern된 문자열은 해제되지 않는다).
+    @field_validator("role")
+    def _intern(cls, value: str) -> str:
+        return sys.intern(value)
 
 
 class AnalyzeRequest(BaseModel):
     session_id: str
     user_input: Optional[str] = None
-    ocr_texts: List[str] = Field(default_factory=list)
+    ocr_texts: OcrTexts = Field(default_factory=list)
     dialogue_history: List[DialogueTurn] = Field(default_factory=list)
     last_btn: Optional[str] = None
 
-    @field_validator("ocr_texts", mode="before")
-    def _ensure_list(cls, value: Any) -> Any:
-        return value or []
-
 
 class Action(BaseModel):
+    model_config = _RESPONSE_CONFIG
+
     type: Literal["click_text", "speak_only", "ask_clarification"]
     params: Dict[str, Any] = Field(default_factory=dict)
 
 
 class AnalyzeResponse(BaseModel):
+    model_config = _RESPONSE_CONFIG
+
     status: Literal["success", "ambiguous", "fail"]
     confidence: float = Field(ge=0.0, le=1.0)
     response_message: str
@@ -36,19 +51,17 @@ class AnalyzeResponse(BaseModel):
 
 
 class ScreenDetectRequest(BaseModel):
-    previous_texts: List[str] = Field(default_factory=list)
-    current_texts: List[str] = Field(default_factory=list)
+    previous_texts: OcrTexts = Field(default_factory=list)
+    current_texts: OcrTexts = Field(default_factory=list)
     session_id: str
     user_input: Optional[str] = None
     dialogue_history: List[DialogueTurn] = Field(default_factory=list)
     last_btn: Optional[str] = None
 
-    @field_validator("previous_texts", "current_texts", mode="before")
-    def _ensure_list(cls, value: Any) -> Any:
-        return value or []
-
 
 class ScreenDetectResponse(BaseModel):
+    model_config = _RESPONSE_CONFIG
+
     is_changed: bool
     similarity_score: float = Field(ge=0.0, le=1.0)
     ai_analysis: Optional[AnalyzeResponse] = None
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import time
+from typing import Optional
+
+import orjson
+from pydantic import ValidationError
+
+from .models import AnalyzeResponse
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """분석 응답을 SQLite(WAL)에 저장해 서버를 재시작해도 같은 요청에 LLM을 다시 부르지 않게 한다."""
+
+    def __init__(
+        self,
+        path: str,
+        namespace: bytes,
+        max_entries: int = 10000,
+        max_age: int = 7 * 24 * 3600,
+        prune_interval: int = 128,
+    ):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.prune_interval = prune_interval
+        self._puts = 0
+        # 이벤트 루프에서 바로 호출하므로 잠금은 짧게만 기다리고(기본 5초), 넘으면 캐시 미스·저장 생략으로 처리한다.
+        self._conn = sqlite3.connect(path, timeout=0.05, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS analyze_cache ("
+            "key BLOB PRIMARY KEY, response BLOB NOT NULL, created_at INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS analyze_cache_created_at ON analyze_cache (created_at)")
+        # 모델이나 프롬프트가 바뀌어 지문이 다른 항목은 다시 쓰이지 않으므로 지운다.
+        self._conn.execute(
+            "DELETE FROM analyze_cache WHERE substr(key, 1, ?) != ?", (len(namespace), namespace)
+        )
+        self._prune()
+
+    def get(self, key: bytes) -> Optional[AnalyzeResponse]:
+        try:
+            row = self._conn.execute(
+                "SELECT response FROM analyze_cache WHERE key = ? AND created_at >= ?",
+                (self.namespace + key, int(time.time()) - self.max_age),
+            ).fetchone()
+        except sqlite3.Error as exc:
+            logger.warning("영구 캐시 조회 실패: %s", exc)
+            return None
+        if row is None:
+            return None
+        try:
+            return AnalyzeResponse.model_validate_json(row[0])
+        except ValidationError as exc:
+            # 손상되었거나 모델 정의와 맞지 않는 항목은 없는 것으로 보고 지운다.
+            logger.warning("영구 캐시 항목을 읽지 못해 무시함: %s", exc)
+            self._delete(key)
+            return None
+
+    def put(self, key: bytes, response: AnalyzeResponse) -> None:
+        try:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analyze_cache (key, response, created_at) VALUES (?, ?, ?)",
+                (self.namespace + key, orjson.dumps(response.model_dump()), int(time.time())),
+            )
+        except sqlite3.Error as exc:
+            logger.warning("영구 캐시 저장 실패: %s", exc)
+            return
+        self._puts += 1
+        if self._puts % self.prune_interval == 0:
+            self._prune()
+
+    def _delete(self, key: bytes) -> None:
+        try:
+            self._conn.execute("DELETE FROM analyze_cache WHERE key = ?", (self.namespace + key,))
+        except sqlite3.Error as exc:
+            logger.warning("영구 캐시 항목 삭제 실패: %s", exc)
+
+    def _prune(self) -> None:
+        try:
+            self._conn.execute("DELETE FROM analyze_cache WHERE created_at < ?", (int(time.time()) - self.max_age,))
+            self._conn.execute(
+                "DELETE FROM analyze_cache WHERE key IN ("
+                "SELECT key FROM analyze_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+        except sqlite3.Error as exc:
+            logger.warning("영구 캐시 정리 실패: %s", exc)
+
+    def close(self) -> None:
+        self._conn.close()
@@ -1,34 +1,66 @@
 from __future__ import annotations
 
-from typing import Iterable, List, Set
+import functools
+from collections import OrderedDict
+from typing import AbstractSet, FrozenSet, Iterable, List, Set, Tuple
 
 from .ai_service import AIService
+from .analyze_batcher import AnalyzeBatcher
 from .models import AnalyzeRequest, ScreenDetectRequest, ScreenDetectResponse
 
 
+@functools.lru_cache(maxsize=4096)
+def _normalize_one(text: str) -> str:
+    # "홈", "버거"처럼 화면마다 반복되는 문자열은 lower()/strip()을 다시 하지 않고 이전 결과를 쓴다.
+    return text.lower().strip()
+
+
 def _normalize(texts: Iterable[str]) -> Set[str]:
-    return {text.strip().lower() for text in texts if text and text.strip()}
+    # map/filter는 C 수준에서 돌아가므로 컴프리헨션보다 가볍다. 빈 문자열은 filter가 걸러낸다.
+    return set(filter(None, map(_normalize_one, texts)))
 
 
 def jaccard_similarity(previous: List[str], current: List[str]) -> float:
-    prev_set = _normalize(previous)
-    curr_set = _normalize(current)
+    return jaccard_from_sets(_normalize(previous), _normalize(current))
+
+
+def jaccard_from_sets(prev_set: AbstractSet[str], curr_set: AbstractSet[str]) -> float:
     if not prev_set and not curr_set:
         return 1.0
-    union = prev_set | curr_set
-    if not union:
-        return 0.0
-    intersection = prev_set & curr_set
-    return len(intersection) / len(union)
+    # 합집합을 만들지 않고 |A ∪ B| = |A| + |B| - |A ∩ B|로 계산한다.
+    inter = len(prev_set & curr_set)
+    return inter / (len(prev_set) + len(curr_set) - inter)
 
 
 class ScreenDetector:
-    def __init__(self, ai_service: AIService, threshold: float = 0.6):
+    def __init__(
+        self,
+        ai_service: AIService,
+        threshold: float = 0.6,
+        max_sessions: int = 1024,
+        batch_window: float = 0.0,
+    ):
         self.ai_service = ai_service
         self.threshold = threshold
+        self.max_sessions = max_sessions
+        # batch_window(초)가 0보다 크면 동시에 들어온 화면 분석 요청을 묶어서 한 번에 보낸다.
+        self.batcher: AnalyzeBatcher | None = None
+        if batch_window > 0:
+            self.batcher = AnalyzeBatcher(ai_service, window=batch_window)
+        # session_id -> (원본 텍스트 튜플의 해시, 정규화된 집합). 직전 요청의 current_texts를 보관한다.
+        self._prev_norm_cache: "OrderedDict[str, Tuple[int, FrozenSet[str]]]" = OrderedDict()
 
     async def detect(self, payload: ScreenDetectRequest) -> ScreenDetectResponse:
-        similarity = jaccard_similarity(payload.previous_texts, payload.current_texts)
+        _, prev_set = self._normalized(payload.session_id, payload.previous_texts)
+        current = self._normalized(payload.session_id, payload.current_texts)
+        curr_set = current[1]
+        # 클라이언트는 보통 이번 current_texts를 다음 요청의 previous_texts로 보내므로 미리 올려 둔다.
+        self._prev_norm_cache[payload.session_id] = current
+        self._prev_norm_cache.move_to_end(payload.session_id)
+        while len(self._prev_norm_cache) > self.max_sessions:
+            self._prev_norm_cache.popitem(last=False)
+
+        similarity = jaccard_from_sets(prev_set, curr_set)
         is_changed = similarity < self.threshold
 
         ai_analysis = None
@@ -40,10 +72,25 @@ class ScreenDetector:
                 dialogue_history=payload.dialogue_history,
                 last_btn=payload.last_btn,
             )
-            ai_analysis = await self.ai_service.analyze(analyze_payload)
+            if self.batcher is not None:
+                ai_analysis = await self.batcher.submit(analyze_payload)
+            else:
+                ai_analysis = await self.ai_service.analyze(analyze_payload)
 
         return ScreenDetectResponse(
             is_changed=is_changed,
             similarity_score=similarity,
             ai_analysis=ai_analysis,
         )
+
+    async def aclose(self) -> None:
+        if self.batcher is not None:
+            await self.batcher.aclose()
+
+    def _normalized(self, session_id: str, texts: List[str]) -> Tuple[int, FrozenSet[str]]:
+        """같은 세션에서 직전 화면과 같은 텍스트 목록이면 정규화 결과를 재사용한다."""
+        key = hash(tuple(texts))
+        cached = self._prev_norm_cache.get(session_id)
+        if cached is not None and cached[0] == key:
+            return cached
+        return key, frozenset(_normalize(texts))
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import operator
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional, Set, Tuple
+
+from openai import OpenAIError
+
+from .models import AnalyzeResponse
+
+logger = logging.getLogger(__name__)
+
+Embedder = Callable[[str], Awaitable[List[float]]]
+
+
+def _unit(vector: List[float]) -> List[float]:
+    norm = math.sqrt(sum(map(operator.mul, vector, vector))) or 1.0
+    return [value / norm for value in vector]
+
+
+class SemanticCache:
+    """같은 화면·대화 맥락(scope) 안에서 의미가 거의 같은 발화에 이전 응답을 재사용한다."""
+
+    def __init__(
+        self,
+        embed: Embedder,
+        threshold: float = 0.95,
+        max_scopes: int = 256,
+        bucket_size: int = 32,
+    ):
+        self.embed = embed
+        self.threshold = threshold
+        self.max_scopes = max_scopes
+        self.bucket_size = bucket_size
+        self._buckets: "OrderedDict[bytes, List[Tuple[List[float], AnalyzeResponse]]]" = OrderedDict()
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def lookup(self, scope: bytes, text: str) -> Tuple[Optional[AnalyzeResponse], Optional[List[float]]]:
+        """(캐시된 응답 또는 None, 계산한 임베딩)을 반환한다. 버킷이 비어 있으면 임베딩을 계산하지 않는다."""
+        bucket = self._buckets.get(scope)
+        if not bucket:
+            return None, None
+        try:
+            vector = _unit(await self.embed(text))
+        except OpenAIError as exc:
+            logger.warning("임베딩 실패로 의미 캐시를 건너뜀: %s", exc)
+            return None, None
+        self._buckets.move_to_end(scope)
+        # 버킷은 최근 bucket_size개뿐이라 정규화된 벡터의 내적(코사인 유사도)을 전부 비교한다.
+        best_score, best_response = max(
+            ((sum(map(operator.mul, vector, cached)), response) for cached, response in bucket),
+            key=operator.itemgetter(0),
+        )
+        if best_score >= self.threshold:
+            return best_response, vector
+        return None, vector
+
+    def store(self, scope: bytes, text: str, response: AnalyzeResponse, vector: Optional[List[float]] = None) -> None:
+        """응답을 저장한다. 임베딩이 아직 없으면 응답 지연을 늘리지 않도록 백그라운드에서 계산한다."""
+        if vector is not None:
+            self._insert(scope, vector, response)
+            return
+
+        async def embed_and_insert() -> None:
+            try:
+                self._insert(scope, _unit(await self.embed(text)), response)
+            except OpenAIError as exc:
+                logger.warning("임베딩 실패로 의미 캐시에 저장하지 못함: %s", exc)
+
+        task = asyncio.create_task(embed_and_insert())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def aclose(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _insert(self, scope: bytes, vector: List[float], response: AnalyzeResponse) -> None:
+        bucket = self._buckets.setdefault(scope, [])
+        self._buckets.move_to_end(scope)
+        bucket.append((vector, response))
+        del bucket[: -self.bucket_size]
+        while len(self._buckets) > self.max_scopes:
+            self._buckets.popitem(last=False)
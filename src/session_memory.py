@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, List, Optional, Sequence, Tuple
+
+import orjson
+
+from .models import DialogueTurn
+
+logger = logging.getLogger(__name__)
+
+# (이전 요약, 새로 요약할 턴들의 JSON 배열 문자열) -> 새 요약
+Summarizer = Callable[[str, str], Awaitable[str]]
+
+
+def _dump_turn(turn: DialogueTurn) -> str:
+    return orjson.dumps({"role": turn.role, "utterance": turn.utterance, "action": turn.action}).decode()
+
+
+@dataclass
+class _SessionState:
+    summary: str = ""
+    summarized_turns: int = 0
+    # 아직 요약되지 않은 턴(history[summarized_turns:])을 턴별로 직렬화해 둔 JSON
+    fragments: List[str] = field(default_factory=list)
+    last_turn: Optional[Tuple[str, str]] = None
+    task: Optional[asyncio.Task] = None
+
+    @property
+    def seen_turns(self) -> int:
+        return self.summarized_turns + len(self.fragments)
+
+
+class SessionMemory:
+    """세션별로 오래된 대화를 요약해 두고, 프롬프트에는 요약 + 최근 턴만 싣는다."""
+
+    def __init__(self, summarizer: Summarizer, window: int = 6, max_sessions: int = 1024):
+        self.summarizer = summarizer
+        self.window = window
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, _SessionState]" = OrderedDict()
+
+    def context(self, session_id: str, history: Sequence[DialogueTurn]) -> Tuple[str, str]:
+        """(요약, 프롬프트에 넣을 최근 턴들의 JSON 배열 문자열)을 반환한다. 이벤트 루프 안에서 호출해야 한다."""
+        state = self._sessions.get(session_id)
+        if state is None or not self._continues(state, history):
+            # 처음 보는 세션이거나 백엔드가 히스토리를 새로 시작한 경우
+            if state is not None and state.task is not None:
+                state.task.cancel()
+            state = _SessionState()
+            self._sessions[session_id] = state
+            self._evict()
+        else:
+            self._sessions.move_to_end(session_id)
+
+        for turn in history[state.seen_turns :]:
+            state.fragments.append(_dump_turn(turn))
+        if history:
+            state.last_turn = (history[-1].role, history[-1].utterance)
+
+        # 요약되지 않은 턴이 2 * window개를 넘으면 최근 window개만 남기고 백그라운드에서 요약한다.
+        if len(state.fragments) > 2 * self.window and state.task is None:
+            self._schedule(session_id, state, len(state.fragments) - self.window)
+        return state.summary, "[" + ",".join(state.fragments) + "]"
+
+    async def aclose(self) -> None:
+        tasks = [state.task for state in self._sessions.values() if state.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    @staticmethod
+    def _continues(state: _SessionState, history: Sequence[DialogueTurn]) -> bool:
+        """이번 히스토리가 지난번에 본 히스토리 뒤에 턴을 덧붙인 것인지 확인한다."""
+        seen = state.seen_turns
+        if len(history) < seen:
+            return False
+        if seen == 0:
+            return True
+        last = history[seen - 1]
+        return (last.role, last.utterance) == state.last_turn
+
+    def _schedule(self, session_id: str, state: _SessionState, count: int) -> None:
+        turns_json = "[" + ",".join(state.fragments[:count]) + "]"
+
+        async def run() -> None:
+            try:
+                summary = await self.summarizer(state.summary, turns_json)
+            except Exception as exc:  # 요약 실패는 다음 요청에서 다시 시도한다.
+                logger.warning("대화 요약 실패 (session=%s): %s", session_id, exc)
+            else:
+                state.summary = summary
+                state.summarized_turns += count
+                del state.fragments[:count]
+            finally:
+                state.task = None
+
+        state.task = asyncio.create_task(run())
+
+    def _evict(self) -> None:
+        while len(self._sessions) > self.max_sessions:
+            _, state = self._sessions.popitem(last=False)
+            if state.task is not None:
+                state.task.cancel()